@@ -18,14 +18,21 @@ let
 
   # Python environment for web scraping / URL collection
   webScrapingPythonEnv = pkgs.python313.withPackages (ps: [
-    ps.requests
-    ps.beautifulsoup4
+    ps.httpx
+    ps.h2
+    ps.selectolax
+    ps.xxhash
     ps.trafilatura
     (ps.slack-sdk.overridePythonAttrs (_: {
       doCheck = false;
     }))
   ]);
 
+  # Python environment for cat-all (magika classifies NUL-containing text files)
+  catAllPythonEnv = pkgs.python313.withPackages (ps: [
+    ps.magika
+  ]);
+
   # ── Haskell stream tools ──────────────────────────────────
 
   tar-map = pkgs.writers.writeHaskellBin "tar-map" {
@@ -198,7 +205,7 @@ let
   '';
 
   cat-all = pkgs.writeScriptBin "cat-all" ''
-    #!${pkgs.python313}/bin/python
+    #!${catAllPythonEnv}/bin/python
     ${builtins.readFile ../scripts/cat-all.py}
   '';
 
@@ -6,9 +6,10 @@
 # Useful for creating context for LLMs.
 # ==============================================================================
 
+import codecs
+import io
 import os
 import sys
-from pathlib import Path
 
 # Files/Dirs to ignore
 IGNORE_DIRS = {
@@ -28,53 +29,152 @@ IGNORE_EXTS = {
     ".woff", ".woff2", ".ttf", ".eot", ".otf"
 }
 
-def is_text_file(path_obj):
-    """Simple heuristic to check if file is text."""
-    if path_obj.suffix.lower() in IGNORE_EXTS:
+STDOUT_BUFSIZE = 1 << 20
+
+# Leading signatures of common binaries (ELF, PE, Mach-O, fat Mach-O, zip, gzip, PDF, PNG, GIF, JPEG)
+BINARY_MAGIC = (
+    b'\x7fELF', b'MZ\x90\x00', b'\xcf\xfa\xed\xfe', b'\xca\xfe\xba\xbe',
+    b'PK\x03\x04', b'\x1f\x8b', b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff'
+)
+
+# Bytes scanned for NULs by is_text_file
+SNIFF_SIZE = 256
+
+_magika = None  # None: not loaded yet; False: unavailable
+
+def magika_says_text(path):
+    """
+    Second opinion for NUL-containing files (UTF-16 sources etc.).
+    The optional magika package (numpy/onnxruntime) is imported on first use only,
+    so trees without such files never pay its startup cost.
+    """
+    global _magika
+    if _magika is None:
+        try:
+            from magika import Magika
+            _magika = Magika()
+        except Exception:
+            _magika = False  # Remember the failure instead of retrying per file
+    if not _magika:
         return False
-    # Identify obvious binary files?
-    # For now, just rely on extensions and try scanning the first chunk
     try:
-        with open(path_obj, 'rb') as f:
-            chunk = f.read(1024)
-            if b'\0' in chunk:
+        return _magika.identify_path(path).output.is_text
+    except Exception:
+        return False
+
+def is_text_file(path):
+    """Simple heuristic to check if file content is text (names are filtered in walk)."""
+    # Check magic bytes first, then a short NUL scan for anything unrecognised
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            head = os.read(fd, 8)
+            if head.startswith(BINARY_MAGIC):
                 return False
+            has_nul = b'\0' in head or b'\0' in os.read(fd, SNIFF_SIZE - len(head))
+        finally:
+            os.close(fd)
     except:
         return False
-    return True
-
-def main():
-    root = Path.cwd()
+    return not has_nul or magika_says_text(path)
 
-    # Walk directory
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Modify dirnames in-place to prune ignored directories
-        dirnames[:] = [d for d in dirnames if d not in IGNORE_DIRS and not d.startswith('.')]
+def walk(root):
+    """Yield paths of candidate files under root, using cached DirEntry types to avoid extra stat calls.
 
-        path_obj_dir = Path(dirpath)
+    All name-based filtering (dirs, files, extensions) happens here, once per entry.
+    """
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
 
-        for name in sorted(filenames):
-            if name in IGNORE_FILES or name.startswith('.'):
+        subdirs = []
+        for e in entries:
+            name = e.name
+            if name[0] == '.':
                 continue
+            if e.is_dir(follow_symlinks=False):
+                if name not in IGNORE_DIRS:
+                    subdirs.append(e.path)
+            elif e.is_file():
+                dot = name.rfind('.')
+                if name in IGNORE_FILES or (dot > 0 and name[dot:].lower() in IGNORE_EXTS):
+                    continue
+                yield e.path
 
-            p = path_obj_dir / name
+        # Reverse so subdirectories are visited in sorted order
+        stack.extend(reversed(subdirs))
 
-            if not is_text_file(p):
-                continue
+def guess_utf16(data):
+    """
+    Byte order of BOM-less UTF-16, or None if the NULs do not look like UTF-16.
+    Mostly-ASCII UTF-16 has NULs in one byte lane of each code unit and almost none in the other.
+    """
+    sample = data[:4096]
+    even, odd = sample[0::2], sample[1::2]
+    if not odd:
+        return None
+    even_nuls, odd_nuls = even.count(0), odd.count(0)
+    if odd_nuls >= 0.4 * len(odd) and even_nuls <= 0.02 * len(even):
+        return 'utf-16-le'
+    if even_nuls >= 0.4 * len(even) and odd_nuls <= 0.02 * len(odd):
+        return 'utf-16-be'
+    return None
+
+def read_utf8(path):
+    """
+    Return file bytes as valid UTF-8, re-encoding with replacement only when needed.
+    Returns None for NUL-containing data that is not UTF-16 and has a NUL within the
+    sniffed prefix (only Magika let it through); a later stray NUL is passed through.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return data.decode('utf-16', errors='replace').encode('utf-8')
+    nul = data.find(b'\0')
+    if nul >= 0:
+        # NUL is valid UTF-8, so it would pass through below; transcode BOM-less UTF-16
+        encoding = guess_utf16(data)
+        if encoding:
+            return data.decode(encoding, errors='replace').encode('utf-8')
+        if nul < SNIFF_SIZE:
+            return None
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError:
+        data = data.decode('utf-8', errors='replace').encode('utf-8')
+    return data
 
-            rel_path = p.relative_to(root)
+def main():
+    root = os.getcwd()
+    prefix_len = len(os.path.join(root, ''))
+    # Block-buffer stdout so each file costs ~one write per MiB instead of three
+    out = io.BufferedWriter(sys.stdout.buffer, buffer_size=STDOUT_BUFSIZE)
 
-            # Print Header
-            print(f"--- {rel_path} ---")
+    try:
+        for path in walk(root):
+            if not is_text_file(path):
+                continue
 
-            # Print Content
+            # Content (already-valid UTF-8 is passed through as bytes)
             try:
-                # Try reading as UTF-8
-                print(p.read_text(encoding='utf-8', errors='replace'))
+                body = read_utf8(path)
             except Exception as e:
-                print(f"[Error reading file: {e}]")
+                body = f"[Error reading file: {e}]".encode('utf-8', errors='replace')
+            if body is None:
+                continue
+
+            # Header
+            header = b"--- " + os.fsencode(path[prefix_len:]) + b" ---\n"
 
-            print() # Empty line delimiter
+            out.writelines((header, body, b"\n\n")) # Empty line delimiter
+    finally:
+        out.flush()
+        out.detach()
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,54 @@
 import sys
 import os
 import argparse
-import requests
+import io
+import httpx
 import tarfile
+import tempfile
 import time
-from typing import Generator, Iterator, Optional, NamedTuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from typing import IO, Generator, Iterator, Optional, NamedTuple
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 # --- 1. Data Structures ---
-class FileMeta(NamedTuple):
+# パス区切り文字を一括置換する変換テーブル
+_SEP_TRANS = str.maketrans({"/": "_", "\\": "_"})
+
+@dataclass(frozen=True)
+class FileMeta:
+    file_id: str
     name: str
     url: str
     timestamp: str
 
-    @property
+    @cached_property
     def safe_filename(self) -> str:
-        # ディレクトリトラバーサル防止かつユニーク化
-        clean_name = self.name.replace("/", "_").replace("\\", "_")
-        return f"{self.timestamp}_{clean_name}"
+        # ディレクトリトラバーサル防止かつユニーク化 (初回アクセス時に一度だけ計算)
+        return f"{self.timestamp}_{self.name.translate(_SEP_TRANS)}"
 
 class Config(NamedTuple):
     token: str
     channel_id: str
 
+class Fetched(NamedTuple):
+    meta: FileMeta
+    size: int
+    body: IO[bytes]
+
+MAX_WORKERS = 8
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+MAX_CONNECTIONS = 16
+COPY_BUFSIZE = 1024 * 1024
+STDOUT_BUFSIZE = 1024 * 1024
+TAR_BUFSIZE = 1024 * 1024
+SMALL_FILE_SIZE = 64 * 1024
+# conversations.history の上限は 999 件
+HISTORY_PAGE_SIZE = 999
+
 # --- 2. Pure Functions ---
 def parse_args(args: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Stream Slack files as a tarball to stdout.")
@@ -38,7 +63,15 @@ def extract_file_meta(message: dict) -> Iterator[FileMeta]:
         url = f.get("url_private_download")
         name = f.get("name", "untitled")
         if url:
-            yield FileMeta(name=name, url=url, timestamp=ts)
+            yield FileMeta(file_id=f.get("id", url), name=name, url=url, timestamp=ts)
+
+def unique_files(files: Iterator[FileMeta]) -> Iterator[FileMeta]:
+    """スレッド内の再共有やブロードキャストで重複する同一ファイルを file.id で除外する"""
+    seen: set[str] = set()
+    for meta in files:
+        if meta.file_id in seen: continue
+        seen.add(meta.file_id)
+        yield meta
 
 def get_token_from_stdin() -> Optional[str]:
     if not sys.stdin.isatty():
@@ -46,43 +79,99 @@ def get_token_from_stdin() -> Optional[str]:
     return os.environ.get("SLACK_BOT_TOKEN")
 
 # --- 3. Stream Generator ---
+def fetch_history_page(client: WebClient, channel_id: str, cursor: Optional[str]) -> dict:
+    """レート制限時は Retry-After に従って待機し、再試行する"""
+    while True:
+        try:
+            return client.conversations_history(channel=channel_id, cursor=cursor, limit=HISTORY_PAGE_SIZE)
+        except SlackApiError as e:
+            if e.response.get("error") != "ratelimited": raise
+            wait = int(e.response.headers.get("Retry-After", 1))
+            print(f"Rate limited, retrying in {wait}s", file=sys.stderr)
+            time.sleep(wait)
+
 def stream_history(client: WebClient, channel_id: str) -> Generator[dict, None, None]:
     cursor = None
     while True:
-        response = client.conversations_history(channel=channel_id, cursor=cursor, limit=100)
+        response = fetch_history_page(client, channel_id, cursor)
         yield from response.get("messages", [])
         if not response.get("has_more"): break
         cursor = response["response_metadata"]["next_cursor"]
 
 # --- 4. Stream Processor (The Tar Packer) ---
-def pipe_to_tar(meta: FileMeta, token: str, tar: tarfile.TarFile) -> None:
-    """HTTPストリームを読みながら、Tarストリームに梱包して送出する"""
-    headers = {"Authorization": f"Bearer {token}"}
-
-    # stream=True でヘッダーだけ先に取得
+def make_client(token: str) -> httpx.Client:
+    """ワーカー間で共有する HTTP/2 クライアント (接続は多重化・再利用される)"""
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    return httpx.Client(
+        http2=True,
+        limits=limits,
+        headers={"Authorization": f"Bearer {token}"},
+        follow_redirects=True,
+        timeout=httpx.Timeout(30.0),
+    )
+
+def fetch_file(meta: FileMeta, client: httpx.Client) -> Optional[Fetched]:
+    """ワーカースレッドでダウンロードし、本文を一時ファイルに退避する"""
     try:
-        with requests.get(meta.url, headers=headers, stream=True) as r:
+        with client.stream("GET", meta.url) as r:
             if r.status_code != 200:
                 print(f"Skipping {meta.safe_filename}: HTTP {r.status_code}", file=sys.stderr)
-                return
-
-            # Tarヘッダーを作成するには、事前にファイルサイズが必要
-            content_length = r.headers.get("Content-Length")
-            if content_length is None:
-                print(f"Skipping {meta.safe_filename}: No Content-Length header", file=sys.stderr)
-                return
+                return None
 
-            size = int(content_length)
+            # 大きいファイルだけディスクへ溢れさせる (メモリを圧迫しない)
+            # Content-Length の無い chunked 転送でも、退避後のサイズで Tar ヘッダーを作れる
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            for chunk in r.iter_bytes(chunk_size=COPY_BUFSIZE):
+                spool.write(chunk)
+            size = spool.tell()
+            spool.seek(0)
+            return Fetched(meta=meta, size=size, body=spool)
 
+    except Exception as e:
+        print(f"Error processing {meta.safe_filename}: {e}", file=sys.stderr)
+        return None
+
+def fetch_all(files: Iterator[FileMeta], client: httpx.Client) -> Generator[Fetched, None, None]:
+    """並列にダウンロードしつつ、元の順序で結果を返す (先読みは MAX_WORKERS*2 件まで)"""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        pending = deque()
+        for meta in files:
+            pending.append(ex.submit(fetch_file, meta, client))
+            if len(pending) >= MAX_WORKERS * 2:
+                if (fetched := pending.popleft().result()):
+                    yield fetched
+        while pending:
+            if (fetched := pending.popleft().result()):
+                yield fetched
+
+def addfile_bytes(tar: tarfile.TarFile, info: tarfile.TarInfo, data: bytes) -> None:
+    """tar.addfile(info, BytesIO(data)) 相当。ヘッダー・本文・パディングを 1 つのバッファで 1 回書き出す"""
+    info.size = len(data)
+    header = info.tobuf(tar.format, tar.encoding, tar.errors)
+    end = len(header) + len(data)
+    buf = bytearray(end + (-len(data) % tarfile.BLOCKSIZE))  # zero-filled padding
+    buf[:len(header)] = header
+    buf[len(header):end] = data
+    tar.fileobj.write(buf)
+    tar.offset += len(buf)
+    tar.members.append(info)
+
+def pipe_to_tar(fetched: Fetched, tar: tarfile.TarFile) -> None:
+    """退避済みの本文をTarストリームに梱包して送出する"""
+    meta = fetched.meta
+    try:
+        with fetched.body:
             # TarInfoの作成
             info = tarfile.TarInfo(name=meta.safe_filename)
-            info.size = size
+            info.size = fetched.size
             info.mtime = int(float(meta.timestamp)) # タイムスタンプも維持
 
-            print(f"Archiving: {meta.safe_filename} ({size} bytes)", file=sys.stderr)
-
-            # rawソケットからTarストリームへ直結 (メモリに溜めない)
-            tar.addfile(tarinfo=info, fileobj=r.raw)
+            print(f"Archiving: {meta.safe_filename} ({fetched.size} bytes)", file=sys.stderr)
+            if fetched.size <= SMALL_FILE_SIZE:
+                # 小さいファイルはヘッダーと本文をまとめて 1 回で書き出す
+                addfile_bytes(tar, info, fetched.body.read())
+            else:
+                tar.addfile(tarinfo=info, fileobj=fetched.body)
 
     except Exception as e:
         print(f"Error processing {meta.safe_filename}: {e}", file=sys.stderr)
@@ -103,18 +192,26 @@ def main():
 
     client = WebClient(token=token)
 
-    # stdout.buffer を 'w|' (ストリーム書き込みモード) で開く
-    with tarfile.open(fileobj=sys.stdout.buffer, mode="w|") as tar:
-        try:
-            messages = stream_history(client, args.channel_id)
-            files = (meta for msg in messages for meta in extract_file_meta(msg))
-
-            for meta in files:
-                pipe_to_tar(meta, token, tar)
-
-        except SlackApiError as e:
-            print(f"API Error: {e}", file=sys.stderr)
-            sys.exit(1)
+    # stdout.buffer を 1 MiB バッファ越しに 'w|' (ストリーム書き込みモード) で開く
+    # GNU 形式なら長いファイル名も pax 拡張ヘッダー無しで格納できる
+    out = io.BufferedWriter(sys.stdout.buffer, buffer_size=STDOUT_BUFSIZE)
+    try:
+        with tarfile.open(fileobj=out, mode="w|", format=tarfile.GNU_FORMAT,
+                          bufsize=TAR_BUFSIZE, copybufsize=COPY_BUFSIZE) as tar:
+            try:
+                messages = stream_history(client, args.channel_id)
+                files = unique_files(meta for msg in messages for meta in extract_file_meta(msg))
+
+                with make_client(token) as http:
+                    for fetched in fetch_all(files, http):
+                        pipe_to_tar(fetched, tar)
+
+            except SlackApiError as e:
+                print(f"API Error: {e}", file=sys.stderr)
+                sys.exit(1)
+    finally:
+        out.flush()
+        out.detach()
 
 if __name__ == "__main__":
     main()
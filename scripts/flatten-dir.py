@@ -9,12 +9,75 @@
 import sys
 import shutil
 import os
+from contextlib import contextmanager
 from pathlib import Path
 
-def flatten_copy(src: Path, dest: Path):
+def iter_files(root: str):
+    """
+    Yields file paths under root using an explicit os.scandir stack.
+    Hidden files (like .DS_Store) are skipped; symlinked directories are not followed.
+    Unreadable directories are reported and skipped.
+    """
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.startswith('.'):
+                        yield entry.path
+        except OSError as e:
+            sys.stderr.write(f"Skipping unreadable directory {d}: {e}\n")
+
+@contextmanager
+def staged(target: str):
+    """
+    Yields a hidden temp path next to target; once the body has written it, renames it over target.
+    A stale hardlink or symlink at target is replaced instead of being written through,
+    and target is never unlinked first, so a target that is its own source survives.
+    """
+    tmp = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.flatten-tmp")
+    try:
+        os.unlink(tmp)  # leftover from an interrupted run
+    except FileNotFoundError:
+        pass
+    try:
+        yield tmp
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+def copy_file(path: str, target: str) -> str:
+    """Copies path to target, preserving metadata."""
+    with staged(target) as tmp:
+        shutil.copy2(path, tmp)
+    return "cp"
+
+def link_or_copy(path: str, target: str) -> str:
+    """
+    Hardlinks path to target (O(1) on the same filesystem), replacing any existing target.
+    Falls back to a metadata-preserving copy across filesystems or where links are unsupported.
+    """
+    with staged(target) as tmp:
+        try:
+            os.link(path, tmp)
+            op = "ln"
+        except OSError:
+            shutil.copy2(path, tmp)
+            op = "cp"
+    return op
+
+def flatten_copy(src: Path, dest: Path, link: bool = False):
     """
     Recursively copies files from src to dest, flattening the hierarchy.
     Renames files: 'subdir/file.txt' -> 'subdir__file.txt'
+    With link=True, same-filesystem files are hardlinked instead, so they share contents with src.
     """
     if not src.exists():
         sys.stderr.write(f"Error: Source '{src}' does not exist.\n")
@@ -27,43 +90,43 @@ def flatten_copy(src: Path, dest: Path):
     # Create destination (Side effect)
     dest.mkdir(parents=True, exist_ok=True)
 
-    # Pure-ish generation of copy tasks
-    # Filter out hidden files like .DS_Store
-    files = (
-        p for p in src.rglob('*')
-        if p.is_file() and not p.name.startswith('.')
-    )
+    src_str = str(src)
+    dest_str = str(dest)
+    prefix_len = len(os.path.join(src_str, ''))
 
     count = 0
-    for p in files:
+    for path in iter_files(src_str):
         try:
             # Create a flat name preserving hierarchy
-            rel_path = p.relative_to(src)
-            # Replace / with __ (Platform agnostic enough for this use case)
             # e.g., "docs/v1/api.md" -> "docs__v1__api.md"
-            flat_name = str(rel_path).replace(os.sep, '__')
-
-            target = dest / flat_name
+            rel_path = path[prefix_len:]
+            flat_name = rel_path.replace(os.sep, '__')
+            target = os.path.join(dest_str, flat_name)
 
-            # Perform copy (preserving metadata)
-            shutil.copy2(p, target)
-            print(f"cp '{rel_path}' -> '{target.name}'")
+            op = link_or_copy(path, target) if link else copy_file(path, target)
+            print(f"{op} '{rel_path}' -> '{flat_name}'")
             count += 1
         except Exception as e:
-            sys.stderr.write(f"Failed to copy {p}: {e}\n")
+            sys.stderr.write(f"Failed to copy {path}: {e}\n")
 
     print(f"\nSuccessfully flattened {count} files to '{dest}'.")
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: flatten-dir <SRC_DIR> <DEST_DIR>")
+    args = sys.argv[1:]
+    # --link: hardlink instead of copy (fast, but edits to the output change the originals)
+    link = "--link" in args
+    if link:
+        args.remove("--link")
+
+    if len(args) != 2:
+        print("Usage: flatten-dir [--link] <SRC_DIR> <DEST_DIR>")
         print("Example: flatten-dir ./my-docs ./flat-docs")
         sys.exit(1)
 
-    src_dir = Path(sys.argv[1]).resolve()
-    dest_dir = Path(sys.argv[2]).resolve()
+    src_dir = Path(args[0]).resolve()
+    dest_dir = Path(args[1]).resolve()
 
-    flatten_copy(src_dir, dest_dir)
+    flatten_copy(src_dir, dest_dir, link)
 
 if __name__ == "__main__":
     main()
@@ -6,19 +6,33 @@
 
 import sys
 import os
+import re
 import tarfile
 import tempfile
+import time
 import io
+import itertools
+import gzip
+import bz2
+import lzma
 import shutil
 import logging
 import signal
-import gc
+import types
 from pathlib import Path
 from dataclasses import dataclass
-from typing import IO, Optional
+from typing import IO, Iterable, Iterator, Optional
 
-# Joblib / Loky for robust process management
-from joblib import Parallel, delayed, parallel_backend
+# Loky (vendored by joblib) for robust process management
+from joblib.externals.loky import get_reusable_executor
+
+# Converter libraries are resolved once here; workers receive them by reference
+try:
+    from markitdown import MarkItDown
+    from openai import OpenAI
+except ImportError as e:
+    sys.stderr.write(f"[Critical Error] {e}\n")
+    sys.exit(1)
 
 # Suppress library noise
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
@@ -31,14 +45,16 @@ warnings.filterwarnings("ignore", category=UserWarning)
 
 @dataclass(frozen=True)
 class FileTask:
-    path: Path
     original_name: str
     mtime: float
+    tar_path: Path
+    offset: int
+    size: int
 
 @dataclass(frozen=True)
 class ConvertSuccess:
     original_name: str
-    content_path: Path
+    content: bytes
     mtime: float
 
 @dataclass(frozen=True)
@@ -60,84 +76,151 @@ ConvertResult = ConvertSuccess | ConvertSkipped | ConvertFailed
 JUNK_PATTERNS = frozenset({".DS_Store"})
 JUNK_PREFIXES = ("._",)
 SKIP_EXTENSIONS = frozenset({".mov", ".mp4", ".mp3", ".wav", ".m4a"})
+COPY_BUFSIZE = 1024 * 1024
+SMALL_MEMBER_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+CONVERT_TIMEOUT = 180  # seconds per file
+# Worker planning (see plan_workers)
+# Limit parallelism to avoid 37GB RAM usage if files are huge (~3GB per worker, as 12 workers
+# used to reach); $MARKTHESEDOWN_MAX_WORKERS overrides the memory-derived cap (see worker_cap)
+WORKER_MEMORY = 3 * 1024 ** 3
+DEFAULT_MAX_WORKERS = 12     # when physical memory cannot be queried
+PROBE_TASKS = 4              # converted on a small pool first to measure per-file time
+SLOW_TASK_TIME = 1.0         # above this per file, use every allowed worker
+TARGET_WALL_TIME = 5.0       # otherwise size the pool to finish in roughly this long
+# Progress line throttling: redraw at most this often, or every N results
+PROGRESS_INTERVAL = 0.1
+PROGRESS_EVERY = 16
+
+# All basename/extension rules folded into one regex, built once at import
+_JUNK_RE = re.compile(
+    r"(?:^|/)(?:" + "|".join(re.escape(p) + "[^/]*" for p in JUNK_PREFIXES)
+    + "|" + "|".join(re.escape(p) for p in JUNK_PATTERNS) + r")$"
+    + r"|[^/]" + "(?i:" + "|".join(re.escape(e) for e in SKIP_EXTENSIONS) + r")$"
+)
 
 def is_valid_member(name: str) -> bool:
-    base = os.path.basename(name)
-    _, ext = os.path.splitext(base)
     return (
-        not base.startswith(JUNK_PREFIXES) and
-        base not in JUNK_PATTERNS and
-        ext.lower() not in SKIP_EXTENSIONS and
-        not name.startswith("..") and
-        not os.path.isabs(name)
+        _JUNK_RE.search(name) is None and
+        not name.startswith("/") and
+        ".." not in name.split("/")
     )
 
 def md_output_name(original: str) -> str:
     base, _ = os.path.splitext(original)
     return base + ".md"
 
-# Worker-side initialization is handled automatically by Loky if needed,
-# but we'll use a functional approach where we instantiate clients purely.
+# Worker-side state: loky ships functions defined in __main__ by value
+# (cloudpickle), so a plain module global is rebuilt for every task.
+# Anchor the cache on a registered module so it survives across tasks
+# handled by the same worker process.
+
+def _worker_cache() -> dict:
+    mod = sys.modules.get("_markthesedown_worker")
+    if mod is None:
+        mod = sys.modules["_markthesedown_worker"] = types.ModuleType("_markthesedown_worker")
+        mod.cache = {}
+    return mod.cache
+
+def _build_llm() -> tuple[Optional[object], Optional[str]]:
+    """Resolve credentials (env, then netrc) and build the LLM client once."""
+    import netrc
+
+    def get_auth(env_key: str, host: str) -> Optional[str]:
+        if (val := os.environ.get(env_key)): return val
+        try:
+            auth = netrc.netrc().authenticators(host)
+            return auth[2] if auth else None
+        except Exception:
+            return None
+
+    openrouter_key = get_auth("OPENROUTER_API_KEY", "openrouter.ai")
+    if openrouter_key:
+        try:
+            return (OpenAI(base_url="https://openrouter.ai/api/v1", api_key=openrouter_key),
+                    os.environ.get("OPENROUTER_MODEL", "google/gemini-2.0-flash-001"))
+        except: pass
+
+    openai_key = get_auth("OPENAI_API_KEY", "api.openai.com")
+    if openai_key:
+        try:
+            return OpenAI(api_key=openai_key), "gpt-4o"
+        except: pass
+
+    return None, None
+
+def _timeout_handler(signum, frame):
+    raise TimeoutError("Conversion timed out")
+
+def _get_converter():
+    """
+    Per-process MarkItDown instance (keyed by pid so forked children rebuild).
+    The SIGALRM handler is installed alongside it, once per worker; tasks only arm/disarm the alarm.
+    """
+    cache = _worker_cache()
+    pid = os.getpid()
+    if (md := cache.get(pid)) is None:
+        llm_client, llm_model = _build_llm()
+        md = cache[pid] = MarkItDown(llm_client=llm_client, llm_model=llm_model)
+        signal.signal(signal.SIGALRM, _timeout_handler)
+    return md
+
+def open_member(task: FileTask) -> IO[bytes]:
+    """
+    Load one member's payload from the spooled tar into a seekable buffer.
+    Small members are read in one go; larger ones spill to disk past SPOOL_MAX_SIZE.
+    """
+    with open(task.tar_path, 'rb') as src:
+        src.seek(task.offset)
+        if task.size < SMALL_MEMBER_SIZE:
+            data = src.read(task.size)
+            if len(data) != task.size: raise EOFError("Truncated tar member")
+            return io.BytesIO(data)
+        buf = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        remaining = task.size
+        while remaining:
+            chunk = src.read(min(remaining, COPY_BUFSIZE))
+            if not chunk: raise EOFError("Truncated tar member")
+            buf.write(chunk)
+            remaining -= len(chunk)
+        buf.seek(0)
+        return buf
+
+def _init_worker():
+    """
+    Loky worker initializer: build the converter (and LLM client) at spawn time,
+    and apply the parent's noise suppression, which is not inherited by workers.
+    """
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore", category=UserWarning)
+    try:
+        _get_converter()
+    except Exception:
+        pass  # Retried per task, where the error is reported as ConvertFailed
 
 def convert_task_isolated(task: FileTask) -> ConvertResult:
     """
     Executed in a separate process.
-    Self-contained, minimal state.
+    Reads its own member from the spooled tar and returns the Markdown bytes,
+    so nothing is written to disk between input and output archive.
+    Converter and LLM client are reused across tasks in the same worker.
     """
     try:
-        # Re-import inside worker to ensure clean state
-        import os
-        from markitdown import MarkItDown
-        from openai import OpenAI
-        import netrc
-
-        # 1. Resolve Auth (Stateless)
-        def get_auth(env_key: str, host: str) -> Optional[str]:
-            if (val := os.environ.get(env_key)): return val
-            try:
-                auth = netrc.netrc().authenticators(host)
-                return auth[2] if auth else None
-            except Exception:
-                return None
-
-        llm_client = None
-        llm_model = None
-
-        openrouter_key = get_auth("OPENROUTER_API_KEY", "openrouter.ai")
-        if openrouter_key:
-             try:
-                llm_client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=openrouter_key)
-                llm_model = os.environ.get("OPENROUTER_MODEL", "google/gemini-2.0-flash-001")
-             except: pass
-
-        if not llm_client:
-            openai_key = get_auth("OPENAI_API_KEY", "api.openai.com")
-            if openai_key:
-                try:
-                    llm_client = OpenAI(api_key=openai_key)
-                    llm_model = "gpt-4o"
-                except: pass
-
-        # 2. Setup Unix Timeout (Pure Signal Approach)
-        # import signal # Already imported at the top level, no need to re-import here.
-
-        def timeout_handler(signum, frame):
-            raise TimeoutError("Conversion timed out")
-
-        # Set alarm for 180 seconds (3 minutes per file)
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(180)
+        # 1. Resolve converter (prebuilt by _init_worker; cache hit)
+        md = _get_converter()
+
+        # 2. Arm Unix Timeout (handler installed once per worker process)
+        signal.alarm(CONVERT_TIMEOUT)
 
         try:
-            # 3. Perform Conversion
-            md = MarkItDown(llm_client=llm_client, llm_model=llm_model)
-            result = md.convert(str(task.path))
+            # 3. Perform Conversion (extension hint lets MarkItDown pick a converter)
+            with open_member(task) as source:
+                _, ext = os.path.splitext(task.original_name)
+                result = md.convert_stream(source, file_extension=ext)
 
-            # 4. Write output to disk
+            # 4. Hand Markdown back to the parent for the output archive
             if result.text_content and result.text_content.strip():
-                output_path = task.path.with_suffix(".md.tmp")
-                output_path.write_bytes(result.text_content.encode('utf-8'))
-                return ConvertSuccess(task.original_name, output_path, task.mtime)
+                return ConvertSuccess(task.original_name, result.text_content.encode('utf-8'), task.mtime)
 
             return ConvertSkipped(task.original_name, "No convertible text content")
 
@@ -146,7 +229,7 @@ def convert_task_isolated(task: FileTask) -> ConvertResult:
             signal.alarm(0)
 
     except TimeoutError:
-        return ConvertFailed(task.original_name, "Timeout (180s)")
+        return ConvertFailed(task.original_name, f"Timeout ({CONVERT_TIMEOUT}s)")
 
     except Exception as e:
         # Capture trace for debugging if needed, but return clean error
@@ -157,108 +240,261 @@ def convert_task_isolated(task: FileTask) -> ConvertResult:
 # Pipeline Phases
 # ==============================================================================
 
-def phase_extract(input_stream: IO[bytes], work_dir: Path) -> list[FileTask]:
-    sys.stderr.write("[Phase 1] Extracting archive...\n")
-    tasks = []
-    with tarfile.open(fileobj=input_stream, mode='r|*') as tar:
+_DECOMPRESSORS = (
+    (b"\x1f\x8b", gzip.open),
+    (b"BZh", bz2.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+)
+
+def spool_input(input_stream: IO[bytes], work_dir: Path) -> Path:
+    """
+    Copy the input archive to disk so it can be opened seekable ('r:*') instead of
+    through tarfile's _Stream. Compressed input is inflated once here, so member
+    offsets in the spooled file are raw byte positions.
+    """
+    raw_path = work_dir / "input.raw"
+    with open(raw_path, 'wb') as f:
+        shutil.copyfileobj(input_stream, f, COPY_BUFSIZE)
+
+    tar_path = work_dir / "input.tar"
+    with open(raw_path, 'rb') as f:
+        head = f.read(6)
+    opener = next((op for magic, op in _DECOMPRESSORS if head.startswith(magic)), None)
+    if opener is None:
+        raw_path.rename(tar_path)
+    else:
+        with opener(raw_path, 'rb') as src, open(tar_path, 'wb') as dest:
+            shutil.copyfileobj(src, dest, COPY_BUFSIZE)
+        raw_path.unlink()
+    return tar_path
+
+def phase_extract(tar_path: Path) -> Iterator[FileTask]:
+    """
+    Index the spooled archive and yield one task per wanted member.
+    Only headers are read here; each worker seeks to its member's data offset
+    and reads it itself, so extraction runs in parallel across the pool.
+    """
+    sys.stderr.write("[Phase 1] Indexing archive...\n")
+    count = 0
+    with tarfile.open(tar_path, mode='r:*') as tar:
         for member in tar:
             if not member.isfile() or not is_valid_member(member.name): continue
-            try:
-                dest_path = work_dir / os.path.normpath(member.name)
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                source = tar.extractfile(member)
-                if source:
-                    dest_path.write_bytes(source.read())
-                    tasks.append(FileTask(dest_path, member.name, member.mtime))
-            except Exception as e:
-                sys.stderr.write(f"[Extract Error] {member.name}: {e}\n")
-    sys.stderr.write(f"[Phase 1] Extracted {len(tasks)} files.\n")
-    return tasks
+            if member.issparse():
+                sys.stderr.write(f"[Extract Error] {member.name}: sparse members are not supported\n")
+                continue
+            count += 1
+            yield FileTask(
+                original_name=member.name,
+                mtime=member.mtime,
+                tar_path=tar_path,
+                offset=member.offset_data,
+                size=member.size,
+            )
+    sys.stderr.write(f"[Phase 1] Indexed {count} files.\n")
 
-def phase_transform(tasks: list[FileTask]) -> list[ConvertResult]:
-    # Determine optimal worker count (keep some breathing room for system)
+def worker_cap() -> int:
+    """
+    Upper bound on the pool size: $MARKTHESEDOWN_MAX_WORKERS if set,
+    otherwise physical memory / WORKER_MEMORY, and never more than the CPU count.
+    """
     cpu_count = os.cpu_count() or 1
-    # Limit parallelism to avoid 37GB RAM usage if files are huge
-    # 8-12 workers is usually the sweet spot for IO/Network bound tasks like this
-    n_jobs = min(cpu_count, 12)
-
-    sys.stderr.write(f"[Phase 2] Converting {len(tasks)} files with {n_jobs} workers uses Joblib...\n")
-
-    results: list[ConvertResult] = []
+    env = os.environ.get("MARKTHESEDOWN_MAX_WORKERS")
+    if env:
+        try:
+            return min(cpu_count, max(1, int(env)))
+        except ValueError:
+            sys.stderr.write(f"[Warn] Ignoring invalid MARKTHESEDOWN_MAX_WORKERS={env!r}\n")
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        by_memory = max(1, memory // WORKER_MEMORY)
+    except (ValueError, OSError, AttributeError):
+        by_memory = DEFAULT_MAX_WORKERS
+    return min(cpu_count, by_memory)
+
+def plan_workers(per_task: float, remaining: int, batch: int, spawn_time: float,
+                 current: int, cap: int) -> tuple[int, int]:
+    """
+    Pick (n_jobs, chunksize) for the next batch from the latest per-task wall time.
+    The pool never shrinks (early files may just be cheap). Growing means spawning a
+    fresh pool, so it only happens when the time saved on the remaining work outweighs
+    the measured spawn cost.
+    """
+    max_jobs = max(current, min(cap, remaining))
+    if per_task > SLOW_TASK_TIME:
+        n_jobs = max_jobs
+    else:
+        n_jobs = min(max_jobs, max(current, round(per_task * remaining / TARGET_WALL_TIME)))
+    if n_jobs > current and per_task * remaining * (1 / current - 1 / n_jobs) < spawn_time:
+        n_jobs = current
+    # Batch enough cheap tasks per dispatch to amortise IPC, but keep every worker fed
+    per_dispatch = int(0.5 / per_task) if per_task > 0 else batch
+    chunksize = max(1, min(per_dispatch, batch // n_jobs))
+    return n_jobs, chunksize
+
+def _worker_ready() -> None:
+    """No-op task: returns once a worker has started and run _init_worker."""
+
+def phase_transform(tasks: Iterable[FileTask],
+                    skips: list[ConvertSkipped],
+                    fails: list[ConvertFailed]) -> Iterator[ConvertSuccess]:
+    """
+    Yield successful conversions in input order as workers finish, so the emitter can write each one immediately.
+    Skipped and failed results are partitioned into skips/fails here and never reach the emit loop.
+    """
+    # Indexing only reads headers, so materialising the task list is cheap
+    tasks = list(tasks)
     total = len(tasks)
-
-    # Use 'loky' backend for robust process management (handles crashes/hangs)
-    # batch_size='auto' helps reduce overhead.
+    completed = 0
+    last_print = 0.0
+
+    def route(result: ConvertResult) -> Optional[ConvertSuccess]:
+        # Classify once: successes flow on to the emitter, everything else is set aside
+        nonlocal completed
+        completed += 1
+        if isinstance(result, ConvertSuccess):
+            report("OK", result.original_name)
+            return result
+        if isinstance(result, ConvertSkipped):
+            skips.append(result)
+            report("SKIP", result.original_name)
+        else:
+            fails.append(result)
+            report("ERR", result.original_name)
+        return None
+
+    def report(status: str, fname: str):
+        # Redraw the progress line at ~10 Hz, every PROGRESS_EVERY results, and on the last one;
+        # a terminal write + flush per result can dominate when files convert quickly
+        nonlocal last_print
+        now = time.monotonic()
+        if completed != total and completed % PROGRESS_EVERY and now - last_print < PROGRESS_INTERVAL:
+            return
+        last_print = now
+
+        # Show progress with last processed file name (truncated)
+        if len(fname) > 30: fname = fname[:13] + "..." + fname[-14:]
+
+        sys.stderr.write(f"\r[Phase 2] {completed}/{total} | {status} | {fname}                    ")
+        sys.stderr.flush()
+
+    if total == 0:
+        sys.stderr.write("[Phase 2] Nothing to convert.\n")
+        return
+
+    # Every conversion runs in a loky worker: robust process management (a crash
+    # or hang in one file cannot take down the parent), without joblib's dispatch layer.
     try:
-        with parallel_backend('loky', n_jobs=n_jobs):
-            # return_as='generator' allows us to stream results and show progress!
-            # timeout is available in recent joblib, but standardized via iterator here.
-
-            generator = Parallel(return_as='generator')(
-                delayed(convert_task_isolated)(task) for task in tasks
-            )
-
-            completed = 0
-            for result in generator:
-                results.append(result)
-                completed += 1
-
-                # Show progress with last processed file name (truncated)
-                status = "OK" if isinstance(result, ConvertSuccess) else ("SKIP" if isinstance(result, ConvertSkipped) else "ERR")
-                fname = result.original_name
-                if len(fname) > 30: fname = fname[:13] + "..." + fname[-14:]
-
-                sys.stderr.write(f"\r[Phase 2] {completed}/{total} | {status} | {fname}                    ")
-                sys.stderr.flush()
-
-                # Explicit GC
-                if completed % 100 == 0:
-                    gc.collect()
+        # Probe: start a small pool, time its spawn, then time the first few files on it
+        probe = tasks[:PROBE_TASKS]
+        cap = worker_cap()
+        probe_jobs = min(len(probe), cap)
+        started = time.monotonic()
+        executor = get_reusable_executor(max_workers=probe_jobs, initializer=_init_worker)
+        executor.submit(_worker_ready).result()
+        spawn_time = time.monotonic() - started
+
+        sys.stderr.write(f"[Phase 2] Probing {len(probe)} of {total} files with {probe_jobs} workers...\n")
+        started = time.monotonic()
+        for result in executor.map(convert_task_isolated, probe):
+            result = route(result)
+            if result is not None:
+                yield result
+        per_task = (time.monotonic() - started) * probe_jobs / len(probe)
+
+        # Convert the rest in doubling batches, re-planning from each batch's timing,
+        # so a few cheap files up front cannot pin a long archive to a small pool
+        rest = tasks[len(probe):]
+        n_jobs = probe_jobs
+        window = len(probe)
+        while rest:
+            window *= 2
+            batch, rest = rest[:window], rest[window:]
+            prev_jobs = n_jobs
+            n_jobs, chunksize = plan_workers(per_task, len(batch) + len(rest), len(batch), spawn_time, n_jobs, cap)
+            sys.stderr.write(f"\n[Phase 2] {per_task * 1000:.0f} ms/file: next {len(batch)} files with {n_jobs} workers (chunksize {chunksize})...\n")
+            if n_jobs != prev_jobs:
+                # Same arguments, so loky hands back the pool, respawned at the new size;
+                # wait for it (as for the probe) so the respawn stays out of per_task
+                started = time.monotonic()
+                executor = get_reusable_executor(max_workers=n_jobs, initializer=_init_worker)
+                executor.submit(_worker_ready).result()
+                spawn_time = time.monotonic() - started
+
+            started = time.monotonic()
+            for result in executor.map(convert_task_isolated, batch, chunksize=chunksize):
+                result = route(result)
+
+                # No explicit gc.collect(): results are small acyclic records and
+                # the heavy conversion heap lives (and is freed) in the workers.
+
+                if result is not None:
+                    yield result
+            per_task = (time.monotonic() - started) * n_jobs / len(batch)
 
     except Exception as e:
         sys.stderr.write(f"\n[Parallel Error] {e}\n")
-        # Joblib usually raises only after everything is stopped,
-        # but we might have partial results in 'results' list if we consumed generator
+        # A broken pool aborts the map; results already yielded
+        # have been written to the output archive.
         pass
 
-    sys.stderr.write(f"\n[Phase 2] Completed {len(results)} conversions.\n")
-    results.sort(key=lambda r: r.original_name)
-    return results
-
-def phase_emit(results: list[ConvertResult], output_stream: IO[bytes], work_dir: Path):
-    sys.stderr.write("[Phase 3] Building output archive...\n")
-    buffer_path = work_dir / "output.tar"
-
-    with tarfile.open(buffer_path, mode='w') as tar:
-        for res in results:
-            if isinstance(res, ConvertSuccess):
-                try:
-                    info = tar.gettarinfo(name=str(res.content_path), arcname=md_output_name(res.original_name))
-                    info.mtime = res.mtime
-                    with open(res.content_path, 'rb') as f:
-                        tar.addfile(info, f)
-                    sys.stderr.write(f"x {md_output_name(res.original_name)}\n")
-                except Exception as e:
-                    sys.stderr.write(f"[Pack Error] {res.original_name}: {e}\n")
-            elif isinstance(res, ConvertSkipped):
-                sys.stderr.write(f"[Skip] {res.original_name}: {res.reason}\n")
-            elif isinstance(res, ConvertFailed):
-                sys.stderr.write(f"[Failed] {res.original_name}: {res.error}\n")
-
-    size = buffer_path.stat().st_size
-    sys.stderr.write(f"[Phase 3] Streaming {size} bytes to stdout...\n")
-
-    with open(buffer_path, 'rb') as f:
-        shutil.copyfileobj(f, output_stream)
+    sys.stderr.write(f"\n[Phase 2] Completed {completed} conversions.\n")
+
+def addfile_bytes(tar: tarfile.TarFile, info: tarfile.TarInfo, data: bytes) -> None:
+    """
+    Same as tar.addfile(info, BytesIO(data)), but header, payload and block
+    padding go out as one write from a single preallocated buffer.
+    """
+    info.size = len(data)
+    header = info.tobuf(tar.format, tar.encoding, tar.errors)
+    end = len(header) + len(data)
+    buf = bytearray(end + (-len(data) % tarfile.BLOCKSIZE))  # zero-filled padding
+    buf[:len(header)] = header
+    buf[len(header):end] = data
+    tar.fileobj.write(buf)
+    tar.offset += len(buf)
+    tar.members.append(info)
+
+def phase_emit(successes: Iterable[ConvertSuccess],
+               skips: list[ConvertSkipped],
+               fails: list[ConvertFailed],
+               output_stream: IO[bytes]):
+    """
+    Append each successful conversion to the output tar as it arrives.
+    Skip/failure notes (filled in by phase_transform meanwhile) are printed in one
+    batch after the archive is closed, so they do not interleave with the Phase 2 progress line.
+    """
+    # Write the tar straight onto the (non-seekable) output stream
+    pack_errors: list[str] = []
+    with tarfile.open(fileobj=output_stream, mode='w|', format=tarfile.GNU_FORMAT, bufsize=COPY_BUFSIZE) as tar:
+        for res in successes:
+            try:
+                info = tarfile.TarInfo(md_output_name(res.original_name))
+                info.mtime = res.mtime
+                info.mode = 0o644
+                addfile_bytes(tar, info, res.content)
+            except Exception as e:
+                pack_errors.append(f"[Pack Error] {res.original_name}: {e}\n")
+        size = tar.offset
+
     output_stream.flush()
+    sys.stderr.writelines(itertools.chain(
+        (f"[Skip] {res.original_name}: {res.reason}\n" for res in skips),
+        (f"[Failed] {res.original_name}: {res.error}\n" for res in fails),
+        pack_errors,
+    ))
+    sys.stderr.write(f"[Phase 3] Streamed {size} bytes.\n")
     sys.stderr.write("[Done]\n")
 
 def run_pipeline(input_stream: IO[bytes], output_stream: IO[bytes]):
     with tempfile.TemporaryDirectory() as temp_dir:
         work_dir = Path(temp_dir)
-        tasks = phase_extract(input_stream, work_dir)
-        results = phase_transform(tasks)
-        phase_emit(results, output_stream, work_dir)
+        tar_path = spool_input(input_stream, work_dir)
+        # Index -> convert -> emit run as one fused stream; only input.tar touches disk
+        tasks = phase_extract(tar_path)
+        skips: list[ConvertSkipped] = []
+        fails: list[ConvertFailed] = []
+        successes = phase_transform(tasks, skips, fails)
+        phase_emit(successes, skips, fails, output_stream)
 
 def main():
     signal.signal(signal.SIGPIPE, signal.SIG_DFL)
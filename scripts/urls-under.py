@@ -1,67 +1,135 @@
 import sys
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from collections import deque
+import re
+import codecs
+import asyncio
+import httpx
+import xxhash
+from selectolax.lexbor import LexborHTMLParser
+from urllib.parse import urljoin, urlsplit
+
+# 同時に処理するリクエスト数の上限
+CONCURRENCY = 32
+# 接続失敗時の再試行回数
+RETRIES = 2
+# 1ページあたりに読み込む本文の上限（巨大なレスポンスでメモリを食い潰さないため）
+MAX_BODY_SIZE = 16 << 20
+
+# <meta charset="..."> / <meta http-equiv="Content-Type" content="...; charset=..."> の検出用
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+def page_encoding(header_charset, body):
+    # 文字コードの決定: Content-Type の charset → 先頭の <meta> → UTF-8
+    if header_charset:
+        candidates = [header_charset]
+    else:
+        m = META_CHARSET_RE.search(body, 0, 4096)
+        candidates = [m.group(1).decode('ascii')] if m else []
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+def url_key(url):
+    # URL文字列ではなく64bitハッシュ値を保持し、大規模クロールでのメモリを抑える
+    return xxhash.xxh3_64_intdigest(url.encode())
 
-def list_urls(start_url):
+async def list_urls(start_url):
     # ドメインとベースパスの解析
-    parsed_start = urlparse(start_url)
+    parsed_start = urlsplit(start_url)
     base_netloc = parsed_start.netloc
     # パスが / で終わっていない場合は調整
     base_path = parsed_start.path if parsed_start.path.endswith('/') else parsed_start.path + '/'
 
+    # 探索済みURLは url_key の値で保持する
     visited = set()
-    queue = deque([start_url])
+    queue = asyncio.Queue()
+    queue.put_nowait(start_url)
 
     # 探索済みに追加（初期URL）
-    visited.add(start_url)
+    visited.add(url_key(start_url))
 
     print(f"Collecting URLs under: {start_url}", file=sys.stderr)
 
-    while queue:
-        current_url = queue.popleft()
-
+    async def crawl_one(client, current_url):
         # 標準出力へ吐く（ここがLLMへの入力となる）
         print(current_url)
 
-        try:
-            response = requests.get(current_url, timeout=10)
+        # ヘッダだけ先に受け取り、本文は必要な場合のみ読み込む
+        async with client.stream('GET', current_url) as response:
             if response.status_code != 200:
-                continue
+                return
 
-            # Content-TypeがHTMLでなければスキップ
+            # Content-TypeがHTMLでなければ本文を読まずにスキップ
             if 'text/html' not in response.headers.get('Content-Type', ''):
+                return
+
+            # Content-Length が上限を超えていれば読まない
+            if int(response.headers.get('Content-Length') or 0) > MAX_BODY_SIZE:
+                return
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                # 上限に達したらそこまでの内容でリンクを拾う
+                if len(body) > MAX_BODY_SIZE:
+                    break
+
+        # lexbor はバイト列を常に UTF-8 として解釈するため、ページの文字コードで
+        # デコードした str を selectolax の lexbor バックエンド (C実装) に渡す
+        encoding = page_encoding(response.charset_encoding, body)
+        tree = LexborHTMLParser(body.decode(encoding, 'replace'))
+
+        for node in tree.css('a[href]'):
+            href = node.attributes.get('href')
+            if not href:
                 continue
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                full_url = urljoin(current_url, href)
-                parsed_url = urlparse(full_url)
-
-                # フラグメント(#)を除去
-                full_url = full_url.split('#')[0]
-
-                # フィルタリング条件:
-                # 1. 未訪問
-                # 2. 同一ドメイン
-                # 3. 指定されたベースパス以下であること
-                if (full_url not in visited and
-                    parsed_url.netloc == base_netloc and
-                    parsed_url.path.startswith(base_path)):
-
-                    visited.add(full_url)
-                    queue.append(full_url)
-
-        except Exception as e:
-            # エラーは標準エラー出力へ（パイプラインを汚さないため）
-            print(f"Error fetching {current_url}: {e}", file=sys.stderr)
+            # フラグメント(#)を除去してから一度だけ分解する
+            full_url = urljoin(current_url, href).partition('#')[0]
+            parsed_url = urlsplit(full_url)
+
+            # フィルタリング条件:
+            # 1. 未訪問
+            # 2. 同一ドメイン
+            # 3. 指定されたベースパス以下であること
+            key = url_key(full_url)
+            if (key not in visited and
+                parsed_url.netloc == base_netloc and
+                parsed_url.path.startswith(base_path)):
+
+                visited.add(key)
+                queue.put_nowait(full_url)
+
+    async def worker(client):
+        # CONCURRENCY 個のワーカーがキューを共有し、同時接続数を制限する
+        while True:
+            current_url = await queue.get()
+            try:
+                await crawl_one(client, current_url)
+            except Exception as e:
+                # エラーは標準エラー出力へ（パイプラインを汚さないため）
+                print(f"Error fetching {current_url}: {e}", file=sys.stderr)
+            finally:
+                queue.task_done()
+
+    # 1つのクライアントを使い回し、同一ホストへの接続(TLS含む)を keep-alive で再利用する
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=RETRIES)
+    async with httpx.AsyncClient(
+        transport=transport,
+        timeout=10,
+        follow_redirects=True,
+        headers={'User-Agent': 'urls-under/1.0'},
+    ) as client:
+        workers = [asyncio.create_task(worker(client)) for _ in range(CONCURRENCY)]
+        await queue.join()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python crawl.py <url>", file=sys.stderr)
         sys.exit(1)
 
-    list_urls(sys.argv[1])
+    asyncio.run(list_urls(sys.argv[1]))